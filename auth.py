@@ -1,111 +1,136 @@
-import sqlite3
-import hashlib
-import secrets
-import json
-from datetime import datetime
-from database import get_db_connection
-import base64
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def generate_did():
-    """Generate a proper Decentralized Identifier with key material"""
-    did_method = "vpn"
-    did_method_specific_id = secrets.token_hex(16)  # 32 characters
-    
-    # Generate key material for the DID
-    verification_key = base64.b64encode(secrets.token_bytes(32)).decode('utf-8')
-    authentication_key = base64.b64encode(secrets.token_bytes(32)).decode('utf-8')
-    
-    did = f"did:{did_method}:{did_method_specific_id}"
-    
-    # Create DID Document
-    did_document = {
-        "@context": [
-            "https://www.w3.org/ns/did/v1",
-            "https://w3id.org/security/suites/ed25519-2020/v1"
-        ],
-        "id": did,
-        "created": datetime.now().isoformat() + "Z",
-        "verificationMethod": [{
-            "id": f"{did}#keys-1",
-            "type": "Ed25519VerificationKey2020", 
-            "controller": did,
-            "publicKeyMultibase": f"z{verification_key}"
-        }],
-        "authentication": [
-            f"{did}#keys-1"
-        ],
-        "assertionMethod": [
-            f"{did}#keys-1"
-        ],
-        "service": [{
-            "id": f"{did}#vpn-service",
-            "type": "ZeroTrustVPN",
-            "serviceEndpoint": "https://vpn-service.example.com",
-            "description": "Zero-Trust VPN Access Service"
-        }]
-    }
-    
-    return did, json.dumps(did_document, indent=2)
-
-def register_user(username, password, email):
-    conn = get_db_connection()
-    
-    # Check if username exists
-    existing_user = conn.execute(
-        'SELECT id FROM users WHERE username = ?', (username,)
-    ).fetchone()
-    
-    if existing_user:
-        conn.close()
-        return False
-    
-    # Create new user with DID
-    password_hash = hash_password(password)
-    did, did_document = generate_did()
-    
-    try:
-        conn.execute(
-            'INSERT INTO users (username, password_hash, email, did, did_document) VALUES (?, ?, ?, ?, ?)',
-            (username, password_hash, email, did, did_document)
-        )
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError as e:
-        print(f"Registration error: {e}")
-        conn.close()
-        return False
-
-def authenticate_user(username, password):
-    conn = get_db_connection()
-    
-    user = conn.execute(
-        'SELECT * FROM users WHERE username = ? AND password_hash = ?',
-        (username, hash_password(password))
-    ).fetchone()
-    
-    conn.close()
-    return user
-
-def get_user_did(user_id):
-    conn = get_db_connection()
-    user = conn.execute(
-        'SELECT did FROM users WHERE id = ?', (user_id,)
-    ).fetchone()
-    conn.close()
-    return user['did'] if user else None
-
-def get_user_did_document(user_id):
-    conn = get_db_connection()
-    user = conn.execute(
-        'SELECT did_document FROM users WHERE id = ?', (user_id,)
-    ).fetchone()
-    conn.close()
-    if user and user['did_document']:
-        try:
-            return json.loads(user['did_document'])
-        except:
-            return {"error": "Invalid DID document format"}
+import sqlite3
+import hashlib
+import hmac
+import logging
+import secrets
+import json
+from datetime import datetime
+from functools import lru_cache
+from database import get_db_connection
+import base64
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+def hash_password(password, salt):
+    """Derive a salted scrypt hash for a password"""
+    return hashlib.scrypt(password.encode(), salt=salt, n=2**14, r=8, p=1).hex()
+
+def generate_did():
+    """Generate a proper Decentralized Identifier with key material"""
+    did_method = "vpn"
+
+    # One CSPRNG draw covers the identifier and both keys
+    buf = secrets.token_bytes(80)
+    did_method_specific_id = buf[:16].hex()  # 32 characters
+    verification_key = base64.b64encode(buf[16:48]).decode('utf-8')
+    authentication_key = base64.b64encode(buf[48:80]).decode('utf-8')
+
+    did = f"did:{did_method}:{did_method_specific_id}"
+    
+    # Create DID Document
+    did_document = {
+        "@context": [
+            "https://www.w3.org/ns/did/v1",
+            "https://w3id.org/security/suites/ed25519-2020/v1"
+        ],
+        "id": did,
+        "created": datetime.now().isoformat() + "Z",
+        "verificationMethod": [{
+            "id": f"{did}#keys-1",
+            "type": "Ed25519VerificationKey2020", 
+            "controller": did,
+            "publicKeyMultibase": f"z{verification_key}"
+        }],
+        "authentication": [
+            f"{did}#keys-1"
+        ],
+        "assertionMethod": [
+            f"{did}#keys-1"
+        ],
+        "service": [{
+            "id": f"{did}#vpn-service",
+            "type": "ZeroTrustVPN",
+            "serviceEndpoint": "https://vpn-service.example.com",
+            "description": "Zero-Trust VPN Access Service"
+        }]
+    }
+    
+    # Store the compact form; pretty-printing is presentation-only
+    if orjson is not None:
+        return did, orjson.dumps(did_document).decode()
+    return did, json.dumps(did_document, separators=(',', ':'))
+
+def register_user(username, password, email):
+    conn = get_db_connection()
+    
+    # Check if username exists
+    existing_user = conn.execute(
+        'SELECT id FROM users WHERE username = ?', (username,)
+    ).fetchone()
+    
+    if existing_user:
+        return False
+    
+    # Create new user with DID
+    password_salt = secrets.token_bytes(16)
+    password_hash = hash_password(password, password_salt)
+    did, did_document = generate_did()
+
+    try:
+        conn.execute(
+            'INSERT INTO users (username, password_hash, password_salt, email, did, did_document) VALUES (?, ?, ?, ?, ?, ?)',
+            (username, password_hash, password_salt.hex(), email, did, did_document)
+        )
+        conn.commit()
+        return True
+    except sqlite3.IntegrityError as e:
+        logger.warning(f"Registration error: {e}")
+        return False
+
+def authenticate_user(username, password):
+    conn = get_db_connection()
+
+    user = conn.execute(
+        'SELECT * FROM users WHERE username = ?', (username,)
+    ).fetchone()
+
+    if not user:
+        return None
+
+    if user['password_salt']:
+        candidate = hash_password(password, bytes.fromhex(user['password_salt']))
+    else:
+        # Accounts created before the salted-scrypt migration
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+
+    if hmac.compare_digest(user['password_hash'], candidate):
+        return user
+    return None
+
+def get_user_did(user_id):
+    conn = get_db_connection()
+    user = conn.execute(
+        'SELECT did FROM users WHERE id = ?', (user_id,)
+    ).fetchone()
+    return user['did'] if user else None
+
+# DID documents are written once at registration, so caching the fetched
+# and parsed document per user is safe
+@lru_cache(maxsize=1024)
+def get_user_did_document(user_id):
+    conn = get_db_connection()
+    user = conn.execute(
+        'SELECT did_document FROM users WHERE id = ?', (user_id,)
+    ).fetchone()
+    if user and user['did_document']:
+        try:
+            if orjson is not None:
+                return orjson.loads(user['did_document'])
+            return json.loads(user['did_document'])
+        except:
+            return {"error": "Invalid DID document format"}
     return None
\ No newline at end of file
@@ -1,141 +1,329 @@
-import hashlib
-import json
-import time
-from datetime import datetime
-from typing import List, Dict, Any
-
-class Block:
-    def __init__(self, index: int, transactions: List[Dict], timestamp: float, previous_hash: str, nonce: int = 0):
-        self.index = index
-        self.transactions = transactions
-        self.timestamp = timestamp
-        self.previous_hash = previous_hash
-        self.nonce = nonce
-        self.hash = self.compute_hash()
-
-    def compute_hash(self) -> str:
-        block_string = json.dumps({
-            "index": self.index,
-            "transactions": self.transactions,
-            "timestamp": self.timestamp,
-            "previous_hash": self.previous_hash,
-            "nonce": self.nonce
-        }, sort_keys=True, default=str)
-        return hashlib.sha256(block_string.encode()).hexdigest()
-
-    def mine_block(self, difficulty: int) -> None:
-        while self.hash[:difficulty] != '0' * difficulty:
-            self.nonce += 1
-            self.hash = self.compute_hash()
-
-class Blockchain:
-    def __init__(self):
-        self.chain: List[Block] = []
-        self.difficulty = 2
-        self.pending_transactions: List[Dict] = []
-        self.mining_reward = 1
-        self.create_genesis_block()
-
-    def create_genesis_block(self) -> None:
-        if len(self.chain) == 0:
-            genesis_block = Block(0, ["Genesis Block"], time.time(), "0")
-            genesis_block.mine_block(self.difficulty)
-            self.chain.append(genesis_block)
-
-    def get_latest_block(self) -> Block:
-        return self.chain[-1]
-
-    def add_transaction(self, transaction: Dict) -> None:
-        self.pending_transactions.append(transaction)
-
-    def mine_pending_transactions(self, mining_reward_address: str) -> None:
-        if not self.pending_transactions:
-            return
-            
-        block = Block(
-            len(self.chain),
-            self.pending_transactions.copy(),
-            time.time(),
-            self.get_latest_block().hash
-        )
-        block.mine_block(self.difficulty)
-        
-        self.chain.append(block)
-        self.pending_transactions = []
-
-    def is_chain_valid(self) -> bool:
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
-
-            if current_block.hash != current_block.compute_hash():
-                return False
-
-            if current_block.previous_hash != previous_block.hash:
-                return False
-
-        return True
-
-    def grant_access(self, owner_did: str, target_did: str, duration: int) -> Dict:
-        # Ensure duration is integer
-        duration = int(duration)
-        
-        transaction = {
-            'type': 'ACCESS_GRANT',
-            'owner_did': owner_did,
-            'target_did': target_did,
-            'duration': duration,
-            'timestamp': datetime.now().isoformat(),
-            'expires_at': (datetime.now().timestamp() + duration)
-        }
-        
-        self.add_transaction(transaction)
-        self.mine_pending_transactions(owner_did)
-        
-        return transaction
-
-    def revoke_access(self, owner_did: str, target_did: str) -> Dict:
-        transaction = {
-            'type': 'ACCESS_REVOKE',
-            'owner_did': owner_did,
-            'target_did': target_did,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        self.add_transaction(transaction)
-        self.mine_pending_transactions(owner_did)
-        
-        return transaction
-
-    def get_user_access_grants(self, user_did: str) -> List[Dict]:
-        grants = []
-        for block in self.chain:
-            if hasattr(block, 'transactions'):
-                for transaction in block.transactions:
-                    if (isinstance(transaction, dict) and 
-                        transaction.get('type') == 'ACCESS_GRANT' and 
-                        transaction.get('owner_did') == user_did):
-                        grants.append(transaction)
-        return grants
-
-    def verify_access(self, user_did: str, resource_did: str) -> bool:
-        for block in reversed(self.chain):
-            if hasattr(block, 'transactions'):
-                for transaction in block.transactions:
-                    if (isinstance(transaction, dict) and 
-                        transaction.get('type') == 'ACCESS_GRANT' and 
-                        transaction.get('owner_did') == resource_did and 
-                        transaction.get('target_did') == user_did):
-                        
-                        # Check if grant is still valid
-                        expires_at = transaction.get('expires_at', 0)
-                        if time.time() < expires_at:
-                            return True
-                            
-                    elif (isinstance(transaction, dict) and 
-                          transaction.get('type') == 'ACCESS_REVOKE' and 
-                          transaction.get('owner_did') == resource_did and 
-                          transaction.get('target_did') == user_did):
-                        return False
-                    
-        return False
\ No newline at end of file
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Upper bound on remembered transaction statuses; oldest entries are
+# pruned first, long after any client has stopped polling them
+_TX_STATUS_LIMIT = 10000
+
+def _transaction_bytes(transaction: Any) -> bytes:
+    """Canonical serialization of a single transaction"""
+    if orjson is not None:
+        return orjson.dumps(transaction, option=orjson.OPT_SORT_KEYS, default=str)
+    return json.dumps(transaction, sort_keys=True, default=str).encode()
+
+def _merkle_root(leaves: List[bytes]) -> str:
+    """Merkle root over serialized transactions, duplicating the last leaf if odd"""
+    if not leaves:
+        return hashlib.sha256(b'').hexdigest()
+    level = [hashlib.sha256(leaf).digest() for leaf in leaves]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest()
+                 for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+class Block:
+    # Blocks accumulate by the thousands and carry a fixed attribute set, so
+    # skip the per-instance __dict__
+    __slots__ = ('index', 'transactions', 'timestamp', 'previous_hash',
+                 'nonce', 'merkle_root', 'hash', '_prefix_ctx')
+
+    def __init__(self, index: int, transactions: List[Dict], timestamp: float, previous_hash: str,
+                 nonce: int = 0, tx_bytes: Optional[List[bytes]] = None):
+        self.index = index
+        self.transactions = transactions
+        self.timestamp = timestamp
+        self.previous_hash = previous_hash
+        self.nonce = nonce
+        # Transactions are immutable once a block owns them: serialize each
+        # exactly once and commit to them through the Merkle root, so hashing
+        # and validation only ever touch the fixed-size header. Callers that
+        # already hold the canonical bytes pass them in via tx_bytes
+        if tx_bytes is None:
+            tx_bytes = [_transaction_bytes(t) for t in transactions]
+        self.merkle_root = _merkle_root(tx_bytes)
+        # Prime one SHA-256 context with the header prefix; everything in it
+        # is immutable after construction, only the nonce still varies. Each
+        # hash is then a cheap context copy + 8-byte update, which keeps the
+        # work inside OpenSSL (SHA-NI where available)
+        self._prefix_ctx = hashlib.sha256(self._prefix_bytes())
+        self.hash = self.compute_hash()
+
+    def _prefix_bytes(self) -> bytes:
+        """Serialize the block header except the nonce, so mining only re-hashes the nonce"""
+        header = '%d|%r|%s|%s|' % (self.index, self.timestamp, self.previous_hash, self.merkle_root)
+        return header.encode()
+
+    def compute_hash(self) -> str:
+        digest = self._prefix_ctx.copy()
+        digest.update(self.nonce.to_bytes(8, 'big'))
+        return digest.hexdigest()
+
+    def verify_hash(self) -> str:
+        """Recompute the header hash from the live fields
+
+        The frozen mining context would just echo whatever the block
+        claimed at construction, so validation must rebuild the header
+        from the current index/timestamp/previous_hash/merkle_root.
+        """
+        digest = hashlib.sha256(self._prefix_bytes())
+        digest.update(self.nonce.to_bytes(8, 'big'))
+        return digest.hexdigest()
+
+    def mine_block(self, difficulty: int) -> None:
+        target = '0' * difficulty
+        while self.hash[:difficulty] != target:
+            self.nonce += 1
+            digest = self._prefix_ctx.copy()
+            digest.update(self.nonce.to_bytes(8, 'big'))
+            self.hash = digest.hexdigest()
+
+class Blockchain:
+    def __init__(self):
+        self.chain: List[Block] = []
+        self.difficulty = 2
+        self.pending_transactions: List[Dict] = []
+        self._pending_tx_bytes: List[bytes] = []
+        self.mining_reward = 1
+        # Running totals so stats readers never iterate the chain
+        self._block_count = 0
+        self._tx_count = 0
+        # Secondary indexes so per-DID lookups don't scan the whole chain
+        self._grants_by_owner: Dict[str, List[Dict]] = {}
+        self._grants_by_target: Dict[str, List[Dict]] = {}
+        self._view_cache = (None, None)
+        # Background miner: requests enqueue transactions and return at
+        # once; one daemon thread drains the queue and batches whatever is
+        # waiting into a single proof-of-work run
+        self._mining_queue: "queue.Queue" = queue.Queue()
+        self._tx_status: Dict[str, Dict] = {}
+        self._miner_thread: Optional[threading.Thread] = None
+        self.create_genesis_block()
+
+    def create_genesis_block(self) -> None:
+        if len(self.chain) == 0:
+            genesis_block = Block(0, ["Genesis Block"], time.time(), "0")
+            genesis_block.mine_block(self.difficulty)
+            self._append_block(genesis_block)
+
+    def _append_block(self, block: Block) -> None:
+        self.chain.append(block)
+        self._block_count += 1
+        self._tx_count += len(block.transactions)
+
+    def stats(self) -> tuple:
+        """O(1) (block count, transaction count) for stats readers"""
+        return self._block_count, self._tx_count
+
+    def get_latest_block(self) -> Block:
+        return self.chain[-1]
+
+    def add_transaction(self, transaction: Dict) -> None:
+        self.pending_transactions.append(transaction)
+        self._pending_tx_bytes.append(_transaction_bytes(transaction))
+        self._index_transaction(transaction)
+
+    def submit_transaction(self, transaction: Dict) -> str:
+        """Queue a transaction for the background miner and return a pending id"""
+        pending_id = uuid.uuid4().hex
+        transaction['pending_id'] = pending_id
+        self._set_tx_status(pending_id, {'status': 'pending'})
+        # Index immediately so grant lookups see the transaction before the
+        # proof-of-work finishes, and serialize once here - the miner and the
+        # Merkle root reuse these bytes
+        self._index_transaction(transaction)
+        self._mining_queue.put((pending_id, transaction, _transaction_bytes(transaction)))
+        self.start_miner()
+        return pending_id
+
+    def get_tx_status(self, pending_id: str) -> Optional[Dict]:
+        return self._tx_status.get(pending_id)
+
+    def _set_tx_status(self, pending_id: str, status: Dict) -> None:
+        self._tx_status[pending_id] = status
+        # Dicts iterate in insertion order, so this drops the oldest entries
+        while len(self._tx_status) > _TX_STATUS_LIMIT:
+            self._tx_status.pop(next(iter(self._tx_status)))
+
+    def start_miner(self) -> None:
+        """Start the background mining thread (idempotent)"""
+        if self._miner_thread and self._miner_thread.is_alive():
+            return
+        self._miner_thread = threading.Thread(target=self._mine_loop, daemon=True)
+        self._miner_thread.start()
+
+    def _mine_loop(self) -> None:
+        while True:
+            batch = [self._mining_queue.get()]
+            # Fold whatever else is already queued into the same block, so
+            # one proof-of-work run is amortized over many transactions
+            while len(batch) < 100:
+                try:
+                    batch.append(self._mining_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # One bad transaction must not kill the miner thread: fail the
+            # batch, drop its pending state, and keep draining the queue
+            try:
+                for _, transaction, canonical in batch:
+                    self.pending_transactions.append(transaction)
+                    self._pending_tx_bytes.append(canonical)
+                self.mine_pending_transactions(batch[0][1].get('owner_did', ''))
+
+                block_index = self.chain[-1].index
+                for pending_id, _, _ in batch:
+                    self._set_tx_status(pending_id, {'status': 'confirmed', 'block_index': block_index})
+            except Exception:
+                # Back out exactly this batch: its pending entries, and the
+                # grant-index entries added eagerly at submit time, so a
+                # failed grant doesn't keep verifying forever. Transactions
+                # queued through add_transaction stay put
+                for pending_id, transaction, canonical in batch:
+                    if transaction in self.pending_transactions:
+                        self.pending_transactions.remove(transaction)
+                    if canonical in self._pending_tx_bytes:
+                        self._pending_tx_bytes.remove(canonical)
+                    self._deindex_transaction(transaction)
+                    self._set_tx_status(pending_id, {'status': 'failed'})
+
+    def _index_transaction(self, transaction: Dict) -> None:
+        if not isinstance(transaction, dict):
+            return
+        tx_type = transaction.get('type')
+        if tx_type == 'ACCESS_GRANT':
+            self._grants_by_owner.setdefault(transaction.get('owner_did'), []).append(transaction)
+            self._grants_by_target.setdefault(transaction.get('target_did'), []).append(transaction)
+        elif tx_type == 'ACCESS_REVOKE':
+            self._grants_by_target.setdefault(transaction.get('target_did'), []).append(transaction)
+
+    def _deindex_transaction(self, transaction: Dict) -> None:
+        """Undo _index_transaction for a transaction that failed to mine"""
+        if not isinstance(transaction, dict):
+            return
+        tx_type = transaction.get('type')
+        if tx_type == 'ACCESS_GRANT':
+            indexes = ((self._grants_by_owner, transaction.get('owner_did')),
+                       (self._grants_by_target, transaction.get('target_did')))
+        elif tx_type == 'ACCESS_REVOKE':
+            indexes = ((self._grants_by_target, transaction.get('target_did')),)
+        else:
+            return
+        for index, key in indexes:
+            entries = index.get(key)
+            if entries and transaction in entries:
+                entries.remove(transaction)
+
+    def mine_pending_transactions(self, mining_reward_address: str) -> None:
+        if not self.pending_transactions:
+            return
+
+        block = Block(
+            len(self.chain),
+            self.pending_transactions.copy(),
+            time.time(),
+            self.get_latest_block().hash,
+            tx_bytes=self._pending_tx_bytes.copy()
+        )
+        block.mine_block(self.difficulty)
+
+        self._append_block(block)
+        self.pending_transactions = []
+        self._pending_tx_bytes = []
+
+    def is_chain_valid(self) -> bool:
+        for i in range(1, len(self.chain)):
+            current_block = self.chain[i]
+            previous_block = self.chain[i-1]
+
+            # Tampered transactions must show up: recompute the Merkle
+            # root from the live transaction list
+            tx_bytes = [_transaction_bytes(t) for t in current_block.transactions]
+            if _merkle_root(tx_bytes) != current_block.merkle_root:
+                return False
+
+            if current_block.hash != current_block.verify_hash():
+                return False
+
+            if current_block.previous_hash != previous_block.hash:
+                return False
+
+        return True
+
+    def grant_access(self, owner_did: str, target_did: str, duration: int) -> Dict:
+        # Ensure duration is integer
+        duration = int(duration)
+        now = datetime.now()
+
+        transaction = {
+            'type': 'ACCESS_GRANT',
+            'owner_did': owner_did,
+            'target_did': target_did,
+            'duration': duration,
+            'timestamp': now.isoformat(),
+            'expires_at': (now.timestamp() + duration)
+        }
+
+        self.submit_transaction(transaction)
+
+        return transaction
+
+    def revoke_access(self, owner_did: str, target_did: str) -> Dict:
+        transaction = {
+            'type': 'ACCESS_REVOKE',
+            'owner_did': owner_did,
+            'target_did': target_did,
+            'timestamp': datetime.now().isoformat()
+        }
+
+        self.submit_transaction(transaction)
+
+        return transaction
+
+    def to_view_list(self) -> List[Dict]:
+        """Render the chain for display, cached until a new block is appended"""
+        cache_key = (len(self.chain), self.chain[-1].hash if self.chain else None)
+        cached_key, cached_view = self._view_cache
+        if cached_key == cache_key:
+            return cached_view
+
+        view = [{
+            'index': block.index,
+            'timestamp': datetime.fromtimestamp(block.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+            'transactions': block.transactions,
+            'previous_hash': block.previous_hash,
+            'hash': block.hash,
+            'nonce': block.nonce
+        } for block in self.chain]
+        self._view_cache = (cache_key, view)
+        return view
+
+    def get_user_access_grants(self, user_did: str) -> List[Dict]:
+        return list(self._grants_by_owner.get(user_did, []))
+
+    def verify_access(self, user_did: str, resource_did: str) -> bool:
+        # Most recent matching transaction decides
+        for transaction in reversed(self._grants_by_target.get(user_did, [])):
+            if transaction.get('owner_did') != resource_did:
+                continue
+
+            if transaction.get('type') == 'ACCESS_REVOKE':
+                return False
+
+            # Check if grant is still valid
+            if time.time() < transaction.get('expires_at', 0):
+                return True
+
+        return False
@@ -1,167 +1,285 @@
-import sqlite3
-import hashlib
-import os
-from datetime import datetime
-
-def get_db_connection():
-    conn = sqlite3.connect('vpn_database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    conn = get_db_connection()
-    
-    # Users table with DID document
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            email TEXT NOT NULL,
-            did TEXT UNIQUE NOT NULL,
-            did_document TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Access logs table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS access_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            action_type TEXT NOT NULL,
-            description TEXT NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            ip_address TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    # WireGuard configurations table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS wireguard_configs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER UNIQUE NOT NULL,
-            private_key TEXT NOT NULL,
-            public_key TEXT NOT NULL,
-            server_public_key TEXT NOT NULL,
-            server_endpoint TEXT NOT NULL,
-            client_ip TEXT NOT NULL,
-            dns_servers TEXT DEFAULT '1.1.1.1',
-            is_active BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    # Demo data table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS demo_stats (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            total_users INTEGER DEFAULT 0,
-            total_blocks INTEGER DEFAULT 0,
-            total_transactions INTEGER DEFAULT 0,
-            vpn_connections INTEGER DEFAULT 0,
-            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Insert initial demo stats
-    conn.execute('''
-        INSERT OR IGNORE INTO demo_stats (id, total_users, total_blocks, total_transactions, vpn_connections)
-        VALUES (1, 0, 1, 0, 0)
-    ''')
-    
-    # Notifications table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS notifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            notification_type TEXT NOT NULL,
-            title TEXT NOT NULL,
-            message TEXT NOT NULL,
-            related_did TEXT,
-            is_read BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-def log_access_attempt(user_id, action_type, description, ip_address=None):
-    conn = get_db_connection()
-    conn.execute(
-        'INSERT INTO access_logs (user_id, action_type, description, ip_address) VALUES (?, ?, ?, ?)',
-        (user_id, action_type, description, ip_address)
-    )
-    conn.commit()
-    conn.close()
-
-def get_user_logs(user_id, limit=50):
-    conn = get_db_connection()
-    logs = conn.execute(
-        'SELECT * FROM access_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?',
-        (user_id, limit)
-    ).fetchall()
-    conn.close()
-    return logs
-
-def create_notification(user_id, notification_type, title, message, related_did=None):
-    """Create a new notification for a user"""
-    conn = get_db_connection()
-    conn.execute(
-        'INSERT INTO notifications (user_id, notification_type, title, message, related_did) VALUES (?, ?, ?, ?, ?)',
-        (user_id, notification_type, title, message, related_did)
-    )
-    conn.commit()
-    conn.close()
-
-def get_user_notifications(user_id, limit=10, unread_only=False):
-    """Get notifications for a user"""
-    conn = get_db_connection()
-    
-    if unread_only:
-        notifications = conn.execute(
-            'SELECT * FROM notifications WHERE user_id = ? AND is_read = FALSE ORDER BY created_at DESC LIMIT ?',
-            (user_id, limit)
-        ).fetchall()
-    else:
-        notifications = conn.execute(
-            'SELECT * FROM notifications WHERE user_id = ? ORDER BY created_at DESC LIMIT ?',
-            (user_id, limit)
-        ).fetchall()
-    
-    conn.close()
-    return notifications
-
-def mark_notification_read(notification_id):
-    """Mark a notification as read"""
-    conn = get_db_connection()
-    conn.execute(
-        'UPDATE notifications SET is_read = TRUE WHERE id = ?',
-        (notification_id,)
-    )
-    conn.commit()
-    conn.close()
-
-def mark_all_notifications_read(user_id):
-    """Mark all notifications as read for a user"""
-    conn = get_db_connection()
-    conn.execute(
-        'UPDATE notifications SET is_read = TRUE WHERE user_id = ?',
-        (user_id,)
-    )
-    conn.commit()
-    conn.close()
-
-def get_unread_notification_count(user_id):
-    """Get count of unread notifications for a user"""
-    conn = get_db_connection()
-    count = conn.execute(
-        'SELECT COUNT(*) FROM notifications WHERE user_id = ? AND is_read = FALSE',
-        (user_id,)
-    ).fetchone()[0]
-    conn.close()
-    return count
\ No newline at end of file
+import sqlite3
+import hashlib
+import os
+import queue
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, has_app_context
+
+# Small pool of reusable connections shared across requests
+POOL_SIZE = 8
+_connection_pool = queue.Queue(maxsize=POOL_SIZE)
+
+# Applied to every new connection: PRAGMAs are per-connection (WAL itself
+# is persistent, but the rest must be set again on each open)
+_CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA foreign_keys=ON',
+)
+
+def _new_connection():
+    # A roomy statement cache keeps the hot INSERT/SELECTs prepared
+    conn = sqlite3.connect('vpn_database.db', check_same_thread=False,
+                           cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _acquire_connection():
+    try:
+        return _connection_pool.get_nowait()
+    except queue.Empty:
+        return _new_connection()
+
+def _release_connection(conn):
+    # Never pool a connection mid-transaction: an error path that bailed
+    # between execute and commit would otherwise hand its uncommitted
+    # writes to the next borrower's commit and pin a stale WAL snapshot
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _connection_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+def get_db_connection():
+    """Get the connection for the current request, opening one if needed"""
+    if has_app_context():
+        if 'db' not in g:
+            g.db = _acquire_connection()
+        return g.db
+    return _acquire_connection()
+
+def close_db_connection(exception=None):
+    """Return the request's connection to the pool (teardown_appcontext)"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        _release_connection(conn)
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for a block of work and return it afterwards
+
+    For code that runs outside the request cycle (managers, background
+    work), where the flask.g / teardown lifecycle doesn't apply.
+    """
+    conn = _acquire_connection()
+    try:
+        yield conn
+    finally:
+        _release_connection(conn)
+
+def init_db():
+    conn = get_db_connection()
+    
+    # Users table with DID document. password_salt sits last so fresh
+    # databases match the column order the ALTER TABLE migration below
+    # produces on old ones
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            email TEXT NOT NULL,
+            did TEXT UNIQUE NOT NULL,
+            did_document TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            password_salt TEXT
+        )
+    ''')
+
+    # Older databases predate the password_salt column
+    try:
+        conn.execute('ALTER TABLE users ADD COLUMN password_salt TEXT')
+    except sqlite3.OperationalError:
+        pass
+
+    # Access logs table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS access_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action_type TEXT NOT NULL,
+            description TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ip_address TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_access_logs_user_ts
+        ON access_logs(user_id, timestamp DESC)
+    ''')
+
+    # WireGuard configurations table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS wireguard_configs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER UNIQUE NOT NULL,
+            private_key TEXT NOT NULL,
+            public_key TEXT NOT NULL,
+            server_public_key TEXT NOT NULL,
+            server_endpoint TEXT NOT NULL,
+            client_ip TEXT NOT NULL,
+            dns_servers TEXT DEFAULT '1.1.1.1',
+            is_active BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # Demo data table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS demo_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            total_users INTEGER DEFAULT 0,
+            total_blocks INTEGER DEFAULT 0,
+            total_transactions INTEGER DEFAULT 0,
+            vpn_connections INTEGER DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Insert initial demo stats
+    conn.execute('''
+        INSERT OR IGNORE INTO demo_stats (id, total_users, total_blocks, total_transactions, vpn_connections)
+        VALUES (1, 0, 1, 0, 0)
+    ''')
+    
+    # Notifications table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            notification_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            message TEXT NOT NULL,
+            related_did TEXT,
+            is_read BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Covers both the per-user notification list and the unread-count poll
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notif_user_unread
+        ON notifications(user_id, is_read, created_at DESC)
+    ''')
+
+    conn.commit()
+
+# Shared between the single and bulk insert paths so the statement cache
+# sees one identical SQL string
+_INSERT_NOTIFICATION_SQL = (
+    'INSERT INTO notifications (user_id, notification_type, title, message, related_did) '
+    'VALUES (?, ?, ?, ?, ?)'
+)
+
+def log_access_attempt(user_id, action_type, description, ip_address=None):
+    conn = get_db_connection()
+    conn.execute(
+        'INSERT INTO access_logs (user_id, action_type, description, ip_address) VALUES (?, ?, ?, ?)',
+        (user_id, action_type, description, ip_address)
+    )
+    conn.commit()
+
+def get_user_logs(user_id, limit=50):
+    conn = get_db_connection()
+    logs = conn.execute(
+        'SELECT * FROM access_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?',
+        (user_id, limit)
+    ).fetchall()
+    return logs
+
+def get_last_login_timestamp(user_id):
+    """Get the timestamp of the user's most recent log entry, or None"""
+    conn = get_db_connection()
+    row = conn.execute(
+        'SELECT timestamp FROM access_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT 1',
+        (user_id,)
+    ).fetchone()
+    return row['timestamp'] if row else None
+
+def create_notification(user_id, notification_type, title, message, related_did=None):
+    """Create a new notification for a user"""
+    conn = get_db_connection()
+    conn.execute(
+        _INSERT_NOTIFICATION_SQL,
+        (user_id, notification_type, title, message, related_did)
+    )
+    conn.commit()
+
+def create_notifications_bulk(rows):
+    """Insert several notifications in one transaction
+
+    rows is an iterable of (user_id, notification_type, title, message, related_did).
+    """
+    conn = get_db_connection()
+    with conn:
+        conn.executemany(_INSERT_NOTIFICATION_SQL, rows)
+
+def get_user_notifications(user_id, limit=10, unread_only=False):
+    """Get notifications for a user"""
+    conn = get_db_connection()
+    
+    if unread_only:
+        notifications = conn.execute(
+            'SELECT * FROM notifications WHERE user_id = ? AND is_read = FALSE ORDER BY created_at DESC LIMIT ?',
+            (user_id, limit)
+        ).fetchall()
+    else:
+        notifications = conn.execute(
+            'SELECT * FROM notifications WHERE user_id = ? ORDER BY created_at DESC LIMIT ?',
+            (user_id, limit)
+        ).fetchall()
+    
+    return notifications
+
+def mark_notification_read(notification_id):
+    """Mark a notification as read"""
+    conn = get_db_connection()
+    conn.execute(
+        'UPDATE notifications SET is_read = TRUE WHERE id = ?',
+        (notification_id,)
+    )
+    conn.commit()
+
+def mark_all_notifications_read(user_id):
+    """Mark all notifications as read for a user"""
+    conn = get_db_connection()
+    conn.execute(
+        'UPDATE notifications SET is_read = TRUE WHERE user_id = ?',
+        (user_id,)
+    )
+    conn.commit()
+
+def get_unread_notification_count(user_id):
+    """Get count of unread notifications for a user"""
+    conn = get_db_connection()
+    count = conn.execute(
+        'SELECT COUNT(*) FROM notifications WHERE user_id = ? AND is_read = FALSE',
+        (user_id,)
+    ).fetchone()[0]
+    return count
+
+def get_unread_notification_state(user_id):
+    """Get (unread count, newest unread id) in one indexed query
+
+    Backs the unread-count poll and its ETag. Deriving the validator
+    from the database keeps every worker in agreement, unlike a
+    per-process counter.
+    """
+    conn = get_db_connection()
+    row = conn.execute(
+        'SELECT COUNT(*), MAX(id) FROM notifications WHERE user_id = ? AND is_read = FALSE',
+        (user_id,)
+    ).fetchone()
+    return row[0], row[1] or 0
\ No newline at end of file
@@ -1,69 +1,81 @@
-from database import get_db_connection
-from blockchain import Blockchain
-from wireguard_real import WireGuardRealManager  # Use real manager
-import json
-from datetime import datetime
-
-class DemoController:
-    def __init__(self):
-        self.blockchain = Blockchain()
-        self.wg_manager = WireGuardRealManager()  # Use real manager
-    
-    def get_demo_stats(self):
-        conn = get_db_connection()
-        stats = conn.execute('SELECT * FROM demo_stats WHERE id = 1').fetchone()
-        conn.close()
-        return dict(stats) if stats else {}
-    
-    def update_demo_stats(self):
-        conn = get_db_connection()
-        
-        # Count users
-        user_count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
-        
-        # Count blocks and transactions
-        block_count = len(self.blockchain.chain)
-        transaction_count = sum(len(block.transactions) for block in self.blockchain.chain)
-        
-        # Count active VPN connections
-        vpn_count = conn.execute('SELECT COUNT(*) FROM wireguard_configs WHERE is_active = TRUE').fetchone()[0]
-        
-        conn.execute('''
-            UPDATE demo_stats 
-            SET total_users = ?, total_blocks = ?, total_transactions = ?, vpn_connections = ?, last_updated = ?
-            WHERE id = 1
-        ''', (user_count, block_count, transaction_count, vpn_count, datetime.now()))
-        
-        conn.commit()
-        conn.close()
-    
-    def create_demo_scenario(self):
-        """Create a demonstration scenario with sample data"""
-        # Create sample access grants
-        sample_grants = [
-            {
-                "owner_did": "did:vpn:blockchain:demoowner123456789",
-                "target_did": "did:vpn:blockchain:demotarget456789012",
-                "duration": 7200,
-                "purpose": "IoT Device Access",
-                "timestamp": datetime.now().isoformat()
-            },
-            {
-                "owner_did": "did:vpn:blockchain:company789012345678",
-                "target_did": "did:vpn:blockchain:employee00123456789", 
-                "duration": 28800,
-                "purpose": "Remote Work Access",
-                "timestamp": datetime.now().isoformat()
-            }
-        ]
-        
-        return {
-            "sample_grants": sample_grants,
-            "blockchain_info": {
-                "total_blocks": len(self.blockchain.chain),
-                "total_transactions": sum(len(block.transactions) for block in self.blockchain.chain),
-                "chain_valid": self.blockchain.is_chain_valid()
-            },
-            "wireguard_status": self.wg_manager.get_server_status(),
-            "wireguard_installed": True  # Since you installed it
+from database import db_connection
+from blockchain import Blockchain
+from wireguard_real import get_wireguard_manager  # Use real manager
+import json
+from datetime import datetime
+
+class DemoController:
+    def __init__(self):
+        # Built on first use: stats-only endpoints never pay for genesis
+        # mining or WireGuard server init
+        self._blockchain = None
+        self._wg_manager = None
+
+    @property
+    def blockchain(self):
+        if self._blockchain is None:
+            self._blockchain = Blockchain()
+        return self._blockchain
+
+    @property
+    def wg_manager(self):
+        if self._wg_manager is None:
+            self._wg_manager = get_wireguard_manager()  # Use real manager
+        return self._wg_manager
+
+    def get_demo_stats(self):
+        with db_connection() as conn:
+            stats = conn.execute('SELECT * FROM demo_stats WHERE id = 1').fetchone()
+        return dict(stats) if stats else {}
+    
+    def update_demo_stats(self):
+        # Count blocks and transactions
+        block_count, transaction_count = self.blockchain.stats()
+
+        # The user and VPN counts run as subqueries, so the whole refresh
+        # is a single statement instead of two SELECTs plus an UPDATE
+        with db_connection() as conn:
+            conn.execute('''
+                UPDATE demo_stats
+                SET total_users = (SELECT COUNT(*) FROM users),
+                    total_blocks = ?,
+                    total_transactions = ?,
+                    vpn_connections = (SELECT COUNT(*) FROM wireguard_configs WHERE is_active = TRUE),
+                    last_updated = ?
+                WHERE id = 1
+            ''', (block_count, transaction_count, datetime.now()))
+
+            conn.commit()
+    
+    def create_demo_scenario(self):
+        """Create a demonstration scenario with sample data"""
+        # Create sample access grants
+        sample_grants = [
+            {
+                "owner_did": "did:vpn:blockchain:demoowner123456789",
+                "target_did": "did:vpn:blockchain:demotarget456789012",
+                "duration": 7200,
+                "purpose": "IoT Device Access",
+                "timestamp": datetime.now().isoformat()
+            },
+            {
+                "owner_did": "did:vpn:blockchain:company789012345678",
+                "target_did": "did:vpn:blockchain:employee00123456789", 
+                "duration": 28800,
+                "purpose": "Remote Work Access",
+                "timestamp": datetime.now().isoformat()
+            }
+        ]
+        
+        block_count, transaction_count = self.blockchain.stats()
+
+        return {
+            "sample_grants": sample_grants,
+            "blockchain_info": {
+                "total_blocks": block_count,
+                "total_transactions": transaction_count,
+                "chain_valid": self.blockchain.is_chain_valid()
+            },
+            "wireguard_status": self.wg_manager.get_server_status(),
+            "wireguard_installed": True  # Since you installed it
         }
\ No newline at end of file
@@ -1,360 +1,471 @@
-import subprocess
-import os
-import secrets
-import base64
-import sqlite3
-from database import get_db_connection
-
-class WireGuardRealManager:
-    def __init__(self):
-        self.config_dir = "wireguard_configs"
-        self.server_config_path = os.path.join(self.config_dir, "wg0.conf")
-        self.server_public_key = None
-        self.server_private_key = None
-        self.server_endpoint = "vpn.zerotrust-demo.com:51820"
-        self.server_ip = "10.0.0.1"
-        self.subnet = "10.0.0.0/24"
-        self.is_running = False
-        
-        # Create config directory
-        os.makedirs(self.config_dir, exist_ok=True)
-        self.initialize_server()
-
-    def initialize_server(self):
-        """Initialize WireGuard server keys and configuration"""
-        # Always generate fresh keys to ensure they're valid
-        self.generate_server_keys()
-        
-        # Load server keys
-        try:
-            with open(os.path.join(self.config_dir, "server_private.key"), "r", encoding='utf-8') as f:
-                self.server_private_key = f.read().strip()
-            
-            with open(os.path.join(self.config_dir, "server_public.key"), "r", encoding='utf-8') as f:
-                self.server_public_key = f.read().strip()
-                
-            print(f"Server Public Key: {self.server_public_key}")
-            print(f"Server Private Key: {self.server_private_key}")
-            
-        except FileNotFoundError:
-            print("Failed to load server keys, regenerating...")
-            self.generate_server_keys()
-
-    def generate_valid_wireguard_key(self):
-        """Generate a valid WireGuard key that passes base64 validation"""
-        # WireGuard uses base64-encoded 32-byte keys
-        key_bytes = secrets.token_bytes(32)
-        key_b64 = base64.b64encode(key_bytes).decode('utf-8')
-        
-        # Ensure it's a valid base64 string
-        try:
-            base64.b64decode(key_b64)
-            return key_b64
-        except:
-            # Regenerate if invalid
-            return self.generate_valid_wireguard_key()
-
-    def generate_server_keys(self):
-        """Generate valid WireGuard server key pair"""
-        try:
-            # First try using system's wg command
-            result = subprocess.run(["wg", "genkey"], capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                private_key = result.stdout.strip()
-                
-                # Validate the private key
-                if len(private_key) == 44 and self.is_valid_base64(private_key):
-                    result_pub = subprocess.run(["wg", "pubkey"], input=private_key, capture_output=True, text=True, shell=True)
-                    if result_pub.returncode == 0:
-                        public_key = result_pub.stdout.strip()
-                        
-                        if len(public_key) == 44 and self.is_valid_base64(public_key):
-                            # Save valid keys
-                            with open(os.path.join(self.config_dir, "server_private.key"), "w", encoding='utf-8') as f:
-                                f.write(private_key)
-                            
-                            with open(os.path.join(self.config_dir, "server_public.key"), "w", encoding='utf-8') as f:
-                                f.write(public_key)
-                            
-                            print("✅ Real WireGuard server keys generated successfully!")
-                            return
-        except Exception as e:
-            print(f"⚠️ Could not generate keys with wg command: {e}")
-        
-        # Fallback: generate valid base64 keys manually
-        print("🔄 Generating valid WireGuard-compatible keys...")
-        private_key = self.generate_valid_wireguard_key()
-        # For demo, we'll use a different approach for public key
-        public_key = self.generate_valid_wireguard_key()
-        
-        with open(os.path.join(self.config_dir, "server_private.key"), "w", encoding='utf-8') as f:
-            f.write(private_key)
-        
-        with open(os.path.join(self.config_dir, "server_public.key"), "w", encoding='utf-8') as f:
-            f.write(public_key)
-        
-        print("✅ Demo WireGuard keys generated successfully!")
-
-    def is_valid_base64(self, s):
-        """Check if string is valid base64"""
-        try:
-            if len(s) % 4 != 0:
-                return False
-            base64.b64decode(s)
-            return True
-        except:
-            return False
-
-    def generate_client_keys(self):
-        """Generate valid WireGuard client key pair"""
-        try:
-            # Try using system wg command first
-            result = subprocess.run(["wg", "genkey"], capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                private_key = result.stdout.strip()
-                
-                if self.is_valid_base64(private_key):
-                    result_pub = subprocess.run(["wg", "pubkey"], input=private_key, capture_output=True, text=True, shell=True)
-                    if result_pub.returncode == 0:
-                        public_key = result_pub.stdout.strip()
-                        if self.is_valid_base64(public_key):
-                            return private_key, public_key
-        except Exception as e:
-            print(f"Using demo client keys: {e}")
-        
-        # Fallback to valid demo keys
-        private_key = self.generate_valid_wireguard_key()
-        public_key = self.generate_valid_wireguard_key()
-        return private_key, public_key
-
-    def get_user_config(self, user_id):
-        conn = get_db_connection()
-        config = conn.execute(
-            'SELECT * FROM wireguard_configs WHERE user_id = ?', (user_id,)
-        ).fetchone()
-        conn.close()
-        
-        if not config:
-            return self.create_user_config(user_id)
-        
-        return config
-
-    def create_user_config(self, user_id):
-        private_key, public_key = self.generate_client_keys()
-        client_ip = f"10.0.0.{user_id + 100}/32"
-        
-        conn = get_db_connection()
-        try:
-            conn.execute(
-                '''INSERT INTO wireguard_configs 
-                   (user_id, private_key, public_key, server_public_key, server_endpoint, client_ip) 
-                   VALUES (?, ?, ?, ?, ?, ?)''',
-                (user_id, private_key, public_key, self.server_public_key, self.server_endpoint, client_ip)
-            )
-            conn.commit()
-        except sqlite3.IntegrityError:
-            # Config already exists, update it with current keys
-            conn.execute(
-                '''UPDATE wireguard_configs 
-                   SET private_key = ?, public_key = ?, server_public_key = ?
-                   WHERE user_id = ?''',
-                (private_key, public_key, self.server_public_key, user_id)
-            )
-            conn.commit()
-        
-        config = conn.execute(
-            'SELECT * FROM wireguard_configs WHERE user_id = ?', (user_id,)
-        ).fetchone()
-        conn.close()
-        
-        return config
-
-    def generate_config_file(self, user_id):
-        """Generate WireGuard configuration file content"""
-        # Ensure we have fresh config with valid keys
-        config = self.create_user_config(user_id)
-        username = self.get_username(user_id)
-        user_did = self.get_user_did(user_id)
-        
-        # Validate keys before generating config
-        if not self.is_valid_base64(config['private_key']):
-            print("⚠️ Invalid private key detected, regenerating...")
-            config = self.create_user_config(user_id)
-        
-        if not self.is_valid_base64(config['server_public_key']):
-            print("⚠️ Invalid server public key detected, regenerating...")
-            self.initialize_server()
-            config = self.create_user_config(user_id)
-        
-        config_content = f"""[Interface]
-PrivateKey = {config['private_key']}
-Address = {config['client_ip']}
-DNS = 1.1.1.1, 8.8.8.8
-
-[Peer]
-PublicKey = {config['server_public_key']}
-Endpoint = {config['server_endpoint']}
-AllowedIPs = 0.0.0.0/0
-PersistentKeepalive = 25
-
-# Zero-Trust VPN Configuration
-# User: {username}
-# Decentralized Identity: {user_did}
-# Generated: {self.get_current_timestamp()}
-# Save as: zerotrust-vpn-{username}.conf
-"""
-        
-        # Save to file for download
-        config_path = os.path.join(self.config_dir, f"wg0-client-{user_id}.conf")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            f.write(config_content)
-            
-        print(f"✅ Configuration generated for user {username}")
-        print(f"📁 Saved to: {config_path}")
-        
-        return config_content
-
-    def get_username(self, user_id):
-        """Get username from database"""
-        conn = get_db_connection()
-        user = conn.execute('SELECT username FROM users WHERE id = ?', (user_id,)).fetchone()
-        conn.close()
-        return user['username'] if user else 'user'
-
-    def get_user_did(self, user_id):
-        """Get user's DID for the config file"""
-        conn = get_db_connection()
-        user = conn.execute('SELECT did FROM users WHERE id = ?', (user_id,)).fetchone()
-        conn.close()
-        return user['did'] if user else "Unknown DID"
-
-    def get_current_timestamp(self):
-        """Get current timestamp for config file"""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    def start_wireguard(self):
-        """Generate WireGuard configuration"""
-        try:
-            # Ensure keys are generated
-            self.initialize_server()
-            print("✅ WireGuard configuration ready!")
-            self.is_running = True
-            return True
-        except Exception as e:
-            print(f"❌ WireGuard configuration failed: {e}")
-            self.is_running = True
-            return False
-
-    def get_server_status(self):
-        """Get WireGuard server status"""
-        # Ensure keys are loaded
-        if not self.server_public_key or not self.is_valid_base64(self.server_public_key):
-            self.initialize_server()
-            
-        if self.is_running and self.server_public_key:
-            key_preview = self.server_public_key[:20] + "..." if len(self.server_public_key) > 20 else self.server_public_key
-            
-            return f"""✅ WireGuard Configuration Ready
-
-Server Public Key: {key_preview}
-Server Endpoint: {self.server_endpoint}
-Server IP: {self.server_ip}
-Key Status: {"Valid" if self.is_valid_base64(self.server_public_key) else "Invalid"}
-
-📋 Instructions:
-1. Download your client configuration file
-2. Open WireGuard Windows application  
-3. Click 'Import tunnel(s) from file'
-4. Select your downloaded .conf file
-5. Click 'Activate' to start VPN
-
-🔒 This configuration includes:
-• Real WireGuard encryption keys
-• Blockchain authentication
-• Zero-Trust security principles
-• Production-ready VPN setup"""
-        else:
-            return """🔧 WireGuard Configuration System
-
-Status: Ready to generate configurations
-WireGuard: Installed (Windows GUI)
-
-To get started:
-1. Click 'Enable VPN' to generate your configuration
-2. Download the .conf file  
-3. Import into WireGuard application
-4. Activate the tunnel
-
-All keys are validated and WireGuard compatible."""
-
-    def enable_vpn(self, user_id):
-        """Enable VPN for user - generates fresh configuration"""
-        try:
-            # Generate fresh configuration with valid keys
-            config_content = self.generate_config_file(user_id)
-            
-            conn = get_db_connection()
-            conn.execute(
-                'UPDATE wireguard_configs SET is_active = TRUE WHERE user_id = ?',
-                (user_id,)
-            )
-            conn.commit()
-            conn.close()
-            
-            self.is_running = True
-            
-            return {
-                'status': 'enabled', 
-                'message': '✅ VPN configuration generated with valid keys! Download the .conf file and import into WireGuard.',
-                'server_status': 'ready',
-                'client_ip': f'10.0.0.{user_id + 100}',
-                'wireguard_ready': True,
-                'keys_valid': True
-            }
-            
-        except Exception as e:
-            return {
-                'status': 'error',
-                'message': f'❌ Failed to generate configuration: {str(e)}',
-                'server_status': 'error'
-            }
-
-    def disable_vpn(self, user_id):
-        """Disable VPN for user"""
-        conn = get_db_connection()
-        conn.execute(
-            'UPDATE wireguard_configs SET is_active = FALSE WHERE user_id = ?',
-            (user_id,)
-        )
-        conn.commit()
-        conn.close()
-        
-        return {
-            'status': 'disabled', 
-            'message': '🔒 VPN configuration deactivated',
-            'server_status': 'stopped'
-        }
-
-    def get_user_status(self, user_id):
-        """Get user's VPN status"""
-        try:
-            config = self.get_user_config(user_id)
-            if config and config['is_active']:
-                return 'active'
-            return 'inactive'
-        except:
-            return 'inactive'
-
-    def validate_configuration(self, user_id):
-        """Validate that configuration has proper keys"""
-        config = self.get_user_config(user_id)
-        
-        valid_private = self.is_valid_base64(config['private_key'])
-        valid_server_pub = self.is_valid_base64(config['server_public_key'])
-        
-        return {
-            'private_key_valid': valid_private,
-            'server_key_valid': valid_server_pub,
-            'all_valid': valid_private and valid_server_pub
-        }
\ No newline at end of file
+import os
+import re
+import secrets
+import base64
+import hashlib
+import time
+from functools import lru_cache
+from database import db_connection
+
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+except ImportError:
+    X25519PrivateKey = None
+
+# A WireGuard key is 32 bytes base64-encoded: 43 base64 chars plus one
+# pad. One precompiled regex pass replaces decode-and-catch validation
+_WG_KEY_RE = re.compile(r'^[A-Za-z0-9+/]{43}=$')
+
+# How long a rendered server status stays fresh; dashboards poll far
+# more often than the underlying state changes
+STATUS_CACHE_TTL = 1.0
+
+# Templates built once at import; per-call work is just filling in the
+# user-specific fields
+_CLIENT_CONF_TMPL = """[Interface]
+PrivateKey = %(private_key)s
+Address = %(client_ip)s
+DNS = 1.1.1.1, 8.8.8.8
+
+[Peer]
+PublicKey = %(server_public_key)s
+Endpoint = %(server_endpoint)s
+AllowedIPs = 0.0.0.0/0
+PersistentKeepalive = 25
+
+# Zero-Trust VPN Configuration
+# User: %(username)s
+# Decentralized Identity: %(did)s
+# Generated: %(timestamp)s
+# Save as: zerotrust-vpn-%(username)s.conf
+"""
+
+_SERVER_STATUS_TMPL = """✅ WireGuard Configuration Ready
+
+Server Public Key: %(key_preview)s
+Server Endpoint: %(server_endpoint)s
+Server IP: %(server_ip)s
+Key Status: %(key_status)s
+
+📋 Instructions:
+1. Download your client configuration file
+2. Open WireGuard Windows application
+3. Click 'Import tunnel(s) from file'
+4. Select your downloaded .conf file
+5. Click 'Activate' to start VPN
+
+🔒 This configuration includes:
+• Real WireGuard encryption keys
+• Blockchain authentication
+• Zero-Trust security principles
+• Production-ready VPN setup"""
+
+# Username/DID never change after registration, so cache the lookup at
+# module level (an lru_cache on the method would pin the manager instance).
+# Both columns come back from one SELECT
+@lru_cache(maxsize=4096)
+def _cached_user_info(user_id):
+    with db_connection() as conn:
+        user = conn.execute('SELECT username, did FROM users WHERE id = ?', (user_id,)).fetchone()
+    if not user:
+        return 'user', "Unknown DID"
+    return user['username'] or 'user', user['did'] or "Unknown DID"
+
+# Content fingerprints of the configs written so far; refreshes that
+# produce byte-identical output skip the disk entirely
+_last_hashes = {}
+
+def _write_file(path, content):
+    """Write a config file in one unbuffered syscall
+
+    Configs are small and regeneratable, so no fsync: the page cache
+    absorbs the write and the request never waits on the disk.
+    Byte-identical rewrites are skipped via a content hash.
+    """
+    data = content.encode('utf-8')
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    if _last_hashes.get(path) == digest:
+        return
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    _last_hashes[path] = digest
+
+class WireGuardRealManager:
+    def __init__(self):
+        self.config_dir = "wireguard_configs"
+        self.server_config_path = os.path.join(self.config_dir, "wg0.conf")
+        self.server_public_key = None
+        self.server_private_key = None
+        self.server_endpoint = "vpn.zerotrust-demo.com:51820"
+        self.server_ip = "10.0.0.1"
+        self.subnet = "10.0.0.0/24"
+        self.is_running = False
+        self._status_cache = (0.0, None)
+        self._server_pub_valid = False
+
+        # Create config directory
+        os.makedirs(self.config_dir, exist_ok=True)
+        self.initialize_server()
+
+    def initialize_server(self):
+        """Initialize WireGuard server keys and configuration"""
+        # Reuse keys from a previous run when they're still valid: fresh
+        # keys would invalidate every client config issued against the old
+        # server public key
+        if self.load_server_keys():
+            print(f"Server Public Key: {self.server_public_key}")
+            return
+
+        print("No valid server keys found, generating...")
+        self.generate_server_keys()
+        self.load_server_keys()
+        print(f"Server Public Key: {self.server_public_key}")
+
+    def load_server_keys(self):
+        """Load server keys from disk, returning True if both are valid"""
+        try:
+            with open(os.path.join(self.config_dir, "server_private.key"), "r", encoding='utf-8') as f:
+                private_key = f.read().strip()
+
+            with open(os.path.join(self.config_dir, "server_public.key"), "r", encoding='utf-8') as f:
+                public_key = f.read().strip()
+        except FileNotFoundError:
+            return False
+
+        if not (self.is_valid_base64(private_key) and self.is_valid_base64(public_key)):
+            return False
+
+        self.server_private_key = private_key
+        self.server_public_key = public_key
+        # The keys were just validated; remember the verdict so status
+        # calls don't re-run the check on an immutable field
+        self._server_pub_valid = True
+        return True
+
+    def generate_valid_wireguard_key(self):
+        """Generate a valid WireGuard key (base64-encoded 32 random bytes)"""
+        # b64encode output is valid base64 by construction, no need to
+        # decode it back to check
+        return base64.b64encode(secrets.token_bytes(32)).decode('ascii')
+
+    def generate_server_keys(self):
+        """Generate valid WireGuard server key pair"""
+        private_key, public_key = self.generate_client_keys()
+
+        with open(os.path.join(self.config_dir, "server_private.key"), "w", encoding='utf-8') as f:
+            f.write(private_key)
+
+        with open(os.path.join(self.config_dir, "server_public.key"), "w", encoding='utf-8') as f:
+            f.write(public_key)
+
+        print("✅ WireGuard server keys generated successfully!")
+
+    def is_valid_base64(self, s):
+        """Check if string is a valid base64 WireGuard key"""
+        return _WG_KEY_RE.match(s) is not None
+
+    def generate_client_keys(self):
+        """Generate valid WireGuard client key pair"""
+        if X25519PrivateKey is not None:
+            # WireGuard keys are X25519: derive the public key in-process
+            # instead of shelling out to wg genkey / wg pubkey
+            priv = X25519PrivateKey.generate()
+            private_key = base64.b64encode(priv.private_bytes(
+                serialization.Encoding.Raw,
+                serialization.PrivateFormat.Raw,
+                serialization.NoEncryption()
+            )).decode('utf-8')
+            public_key = base64.b64encode(priv.public_key().public_bytes(
+                serialization.Encoding.Raw,
+                serialization.PublicFormat.Raw
+            )).decode('utf-8')
+            return private_key, public_key
+
+        # Fallback to valid demo keys
+        private_key = self.generate_valid_wireguard_key()
+        public_key = self.generate_valid_wireguard_key()
+        return private_key, public_key
+
+    def get_user_config(self, user_id):
+        with db_connection() as conn:
+            config = conn.execute(
+                'SELECT * FROM wireguard_configs WHERE user_id = ?', (user_id,)
+            ).fetchone()
+        
+        if not config:
+            return self.create_user_config(user_id)
+        
+        return config
+
+    def _upsert_user_config(self, conn, user_id):
+        """Upsert a user's config on an existing connection (no commit)"""
+        private_key, public_key = self.generate_client_keys()
+        client_ip = f"10.0.0.{user_id + 100}/32"
+
+        # Upsert and read the row back in one statement: an existing config
+        # gets refreshed with the current keys
+        return conn.execute(
+            '''INSERT INTO wireguard_configs
+               (user_id, private_key, public_key, server_public_key, server_endpoint, client_ip)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(user_id) DO UPDATE SET
+                   private_key = excluded.private_key,
+                   public_key = excluded.public_key,
+                   server_public_key = excluded.server_public_key
+               RETURNING *''',
+            (user_id, private_key, public_key, self.server_public_key, self.server_endpoint, client_ip)
+        ).fetchone()
+
+    def create_user_config(self, user_id):
+        with db_connection() as conn:
+            config = self._upsert_user_config(conn, user_id)
+            conn.commit()
+
+        return config
+
+    def create_user_configs(self, user_ids):
+        """Create configs for several users in one batched round-trip
+
+        Same conflict semantics as _upsert_user_config, which is
+        canonical: re-creating a config rotates its keys.
+        """
+        if not user_ids:
+            return []
+
+        rows = []
+        for user_id in user_ids:
+            private_key, public_key = self.generate_client_keys()
+            rows.append((user_id, private_key, public_key, self.server_public_key,
+                         self.server_endpoint, f"10.0.0.{user_id + 100}/32"))
+
+        placeholders = ','.join('?' * len(user_ids))
+        with db_connection() as conn:
+            conn.executemany(
+                '''INSERT INTO wireguard_configs
+                   (user_id, private_key, public_key, server_public_key, server_endpoint, client_ip)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET
+                       private_key = excluded.private_key,
+                       public_key = excluded.public_key,
+                       server_public_key = excluded.server_public_key''',
+                rows
+            )
+            conn.commit()
+
+            configs = conn.execute(
+                f'SELECT * FROM wireguard_configs WHERE user_id IN ({placeholders})',
+                list(user_ids)
+            ).fetchall()
+
+        return configs
+
+    def enable_vpn_many(self, user_ids):
+        """Activate VPN for several users with a single UPDATE"""
+        if not user_ids:
+            return
+        self.create_user_configs(user_ids)
+
+        placeholders = ','.join('?' * len(user_ids))
+        with db_connection() as conn:
+            conn.execute(
+                f'UPDATE wireguard_configs SET is_active = TRUE WHERE user_id IN ({placeholders})',
+                list(user_ids)
+            )
+            conn.commit()
+
+        self.is_running = True
+
+    def disable_vpn_many(self, user_ids):
+        """Deactivate VPN for several users with a single UPDATE"""
+        if not user_ids:
+            return
+
+        placeholders = ','.join('?' * len(user_ids))
+        with db_connection() as conn:
+            conn.execute(
+                f'UPDATE wireguard_configs SET is_active = FALSE WHERE user_id IN ({placeholders})',
+                list(user_ids)
+            )
+            conn.commit()
+
+    def generate_config_file(self, user_id, config=None):
+        """Generate WireGuard configuration file content"""
+        # create_user_config only ever writes keys that generate_client_keys
+        # already validated, so no post-hoc revalidation is needed here
+        if config is None:
+            config = self.create_user_config(user_id)
+        username, user_did = self.get_user_info(user_id)
+
+        config_content = _CLIENT_CONF_TMPL % {
+            'private_key': config['private_key'],
+            'client_ip': config['client_ip'],
+            'server_public_key': config['server_public_key'],
+            'server_endpoint': config['server_endpoint'],
+            'username': username,
+            'did': user_did,
+            'timestamp': self.get_current_timestamp()
+        }
+        
+        # Save to file for download
+        config_path = os.path.join(self.config_dir, f"wg0-client-{user_id}.conf")
+        _write_file(config_path, config_content)
+
+
+        print(f"✅ Configuration generated for user {username}")
+        print(f"📁 Saved to: {config_path}")
+        
+        return config_content
+
+    def get_user_info(self, user_id):
+        """Get (username, did) for a user in a single query"""
+        return _cached_user_info(user_id)
+
+    def get_username(self, user_id):
+        """Get username from database"""
+        return _cached_user_info(user_id)[0]
+
+    def get_user_did(self, user_id):
+        """Get user's DID for the config file"""
+        return _cached_user_info(user_id)[1]
+
+    def get_current_timestamp(self):
+        """Get current timestamp for config file"""
+        from datetime import datetime
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def start_wireguard(self):
+        """Generate WireGuard configuration"""
+        try:
+            # Ensure keys are generated
+            self.initialize_server()
+            print("✅ WireGuard configuration ready!")
+            self.is_running = True
+            return True
+        except Exception as e:
+            print(f"❌ WireGuard configuration failed: {e}")
+            self.is_running = True
+            return False
+
+    def get_server_status(self):
+        """Get WireGuard server status"""
+        # Status barely changes between polls; serve the rendered string
+        # from a short TTL cache
+        now = time.monotonic()
+        cached_at, cached = self._status_cache
+        if cached is not None and now - cached_at < STATUS_CACHE_TTL:
+            return cached
+
+        status = self._render_server_status()
+        self._status_cache = (now, status)
+        return status
+
+    def _render_server_status(self):
+        """Build the server status string (uncached)"""
+        # Ensure keys are loaded
+        if not self._server_pub_valid:
+            self.initialize_server()
+
+        if self.is_running and self.server_public_key:
+            key_preview = self.server_public_key[:20] + "..." if len(self.server_public_key) > 20 else self.server_public_key
+
+            return _SERVER_STATUS_TMPL % {
+                'key_preview': key_preview,
+                'server_endpoint': self.server_endpoint,
+                'server_ip': self.server_ip,
+                'key_status': "Valid" if self._server_pub_valid else "Invalid"
+            }
+        else:
+            return """🔧 WireGuard Configuration System
+
+Status: Ready to generate configurations
+WireGuard: Installed (Windows GUI)
+
+To get started:
+1. Click 'Enable VPN' to generate your configuration
+2. Download the .conf file  
+3. Import into WireGuard application
+4. Activate the tunnel
+
+All keys are validated and WireGuard compatible."""
+
+    def enable_vpn(self, user_id):
+        """Enable VPN for user - generates fresh configuration"""
+        try:
+            # Upsert the config and flip is_active under one commit, so
+            # enabling costs a single WAL fsync instead of two
+            with db_connection() as conn:
+                config = self._upsert_user_config(conn, user_id)
+                conn.execute(
+                    'UPDATE wireguard_configs SET is_active = TRUE WHERE user_id = ?',
+                    (user_id,)
+                )
+                conn.commit()
+
+            # File write stays outside the transaction
+            self.generate_config_file(user_id, config=config)
+
+            self.is_running = True
+            
+            return {
+                'status': 'enabled', 
+                'message': '✅ VPN configuration generated with valid keys! Download the .conf file and import into WireGuard.',
+                'server_status': 'ready',
+                'client_ip': f'10.0.0.{user_id + 100}',
+                'wireguard_ready': True,
+                'keys_valid': True
+            }
+            
+        except Exception as e:
+            return {
+                'status': 'error',
+                'message': f'❌ Failed to generate configuration: {str(e)}',
+                'server_status': 'error'
+            }
+
+    def disable_vpn(self, user_id):
+        """Disable VPN for user"""
+        with db_connection() as conn:
+            conn.execute(
+                'UPDATE wireguard_configs SET is_active = FALSE WHERE user_id = ?',
+                (user_id,)
+            )
+            conn.commit()
+        
+        return {
+            'status': 'disabled', 
+            'message': '🔒 VPN configuration deactivated',
+            'server_status': 'stopped'
+        }
+
+    def get_user_status(self, user_id):
+        """Get user's VPN status"""
+        try:
+            config = self.get_user_config(user_id)
+            if config and config['is_active']:
+                return 'active'
+            return 'inactive'
+        except:
+            return 'inactive'
+
+    def validate_configuration(self, user_id):
+        """Validate that configuration has proper keys"""
+        config = self.get_user_config(user_id)
+        
+        valid_private = self.is_valid_base64(config['private_key'])
+        valid_server_pub = self.is_valid_base64(config['server_public_key'])
+
+        return {
+            'private_key_valid': valid_private,
+            'server_key_valid': valid_server_pub,
+            'all_valid': valid_private and valid_server_pub
+        }
+
+@lru_cache(maxsize=1)
+def get_wireguard_manager():
+    """Shared manager instance, so server init runs once per process"""
+    return WireGuardRealManager()
\ No newline at end of file
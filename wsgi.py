@@ -0,0 +1,11 @@
+from gevent import monkey
+monkey.patch_all()
+
+# Import the app only after monkey-patching so socket, threading, queue
+# and time are already cooperative. sqlite3 is not patched by gevent;
+# its calls still block the hub, which is acceptable here because the
+# queries are small and busy_timeout bounds lock waits
+from app import app
+
+if __name__ == '__main__':
+    app.run()